@@ -8,12 +8,14 @@ Test file protection mechanisms to ensure MCP doesn't scan:
 from pathlib import Path
 from unittest.mock import patch
 
+from utils import security_config
 from utils.file_utils import (
     expand_paths,
     get_user_home_directory,
     is_home_directory_root,
     is_mcp_directory,
 )
+from utils.security_config import is_excluded_dir
 
 
 class TestMCPDirectoryDetection:
@@ -242,6 +244,46 @@ class TestExcludedDirectories:
         assert "index.js" in file_names
         assert "generated.js" not in file_names
 
+    def test_glob_excluded_directories(self, tmp_path):
+        """Test that glob entries in EXCLUDED_DIRS (e.g. *.egg-info) are matched."""
+        project = tmp_path / "package"
+        project.mkdir()
+
+        egg_info = project / "mypackage.egg-info"
+        egg_info.mkdir()
+        (egg_info / "setup_hook.py").write_text("# Generated")
+
+        # Only the glob suffix is excluded, not names merely containing it
+        egg_info_docs = project / "egg-info-docs"
+        egg_info_docs.mkdir()
+        (egg_info_docs / "notes.py").write_text("# Notes")
+
+        files = expand_paths([str(project)])
+
+        file_names = [Path(f).name for f in files]
+
+        assert "notes.py" in file_names
+        assert "setup_hook.py" not in file_names
+
+    def test_is_excluded_dir(self):
+        """Test literal and glob matching of directory names."""
+        assert is_excluded_dir("node_modules") is True
+        assert is_excluded_dir("__pycache__") is True
+        assert is_excluded_dir("mypackage.egg-info") is True
+        assert is_excluded_dir("backup~") is True
+
+        assert is_excluded_dir("src") is False
+        assert is_excluded_dir("node_modules_docs") is False
+        assert is_excluded_dir("egg-info") is False
+
+    def test_no_glob_entries_excludes_nothing_extra(self, monkeypatch):
+        """Test that an exclusion list without glob entries doesn't match every name."""
+        assert security_config._compile_globs(set()) is None
+
+        monkeypatch.setattr(security_config, "_EXCLUDED_RE", security_config._compile_globs(set()))
+        assert is_excluded_dir("node_modules") is True
+        assert is_excluded_dir("src") is False
+
 
 class TestIntegrationScenarios:
     """Test realistic integration scenarios."""
@@ -14,48 +14,60 @@ Additionally, this fix properly handles home directory containers:
   and handled by is_home_directory_root() in resolve_and_validate_path()
 """
 
+import os
+import tempfile
 from pathlib import Path
+from types import SimpleNamespace
 
-from utils.security_config import is_dangerous_path
+import pytest
+
+from utils import security_config
+from utils.security_config import (
+    is_dangerous_path,
+    is_dangerous_path_str,
+    register_safe_root,
+)
+
+
+def _paths(*path_strs):
+    """Build each Path once at collection time, using the path string as the test id."""
+    return [pytest.param(Path(path_str), id=path_str) for path_str in path_strs]
 
 
 class TestPathTraversalFix:
     """Test that subdirectories of dangerous system paths are blocked."""
 
-    def test_exact_match_still_works(self):
+    @pytest.mark.parametrize("path", _paths("/etc", "/usr", "/var"))
+    def test_exact_match_still_works(self, path):
         """Test that exact dangerous paths are still blocked."""
-        assert is_dangerous_path(Path("/etc")) is True
-        assert is_dangerous_path(Path("/usr")) is True
-        assert is_dangerous_path(Path("/var")) is True
+        assert is_dangerous_path(path) is True
 
-    def test_subdirectory_now_blocked(self):
+    # These were allowed before the fix
+    @pytest.mark.parametrize("path", _paths("/etc/passwd", "/etc/shadow", "/etc/hosts", "/var/log/auth.log"))
+    def test_subdirectory_now_blocked(self, path):
         """Test that subdirectories of system paths are blocked (the fix)."""
-        # These were allowed before the fix
-        assert is_dangerous_path(Path("/etc/passwd")) is True
-        assert is_dangerous_path(Path("/etc/shadow")) is True
-        assert is_dangerous_path(Path("/etc/hosts")) is True
-        assert is_dangerous_path(Path("/var/log/auth.log")) is True
+        assert is_dangerous_path(path) is True
 
-    def test_deeply_nested_blocked(self):
+    @pytest.mark.parametrize("path", _paths("/etc/ssh/sshd_config", "/usr/local/bin/python"))
+    def test_deeply_nested_blocked(self, path):
         """Test that deeply nested system paths are blocked."""
-        assert is_dangerous_path(Path("/etc/ssh/sshd_config")) is True
-        assert is_dangerous_path(Path("/usr/local/bin/python")) is True
+        assert is_dangerous_path(path) is True
 
     def test_root_blocked(self):
         """Test that root directory is blocked."""
         assert is_dangerous_path(Path("/")) is True
 
-    def test_safe_paths_allowed(self):
+    # User project directories should be allowed
+    @pytest.mark.parametrize("path", _paths("/tmp/test", "/tmp/myproject/src"))
+    def test_safe_paths_allowed(self, path):
         """Test that safe paths are still allowed."""
-        # User project directories should be allowed
-        assert is_dangerous_path(Path("/tmp/test")) is False
-        assert is_dangerous_path(Path("/tmp/myproject/src")) is False
+        assert is_dangerous_path(path) is False
 
-    def test_similar_names_not_blocked(self):
+    # /etcbackup should NOT be blocked (it's not under /etc)
+    @pytest.mark.parametrize("path", _paths("/tmp/etcbackup", "/tmp/my_etc_files"))
+    def test_similar_names_not_blocked(self, path):
         """Test that paths with similar names are not blocked."""
-        # /etcbackup should NOT be blocked (it's not under /etc)
-        assert is_dangerous_path(Path("/tmp/etcbackup")) is False
-        assert is_dangerous_path(Path("/tmp/my_etc_files")) is False
+        assert is_dangerous_path(path) is False
 
 
 class TestHomeDirectoryHandling:
@@ -70,18 +82,17 @@ class TestHomeDirectoryHandling:
         """Test that /home itself is blocked."""
         assert is_dangerous_path(Path("/home")) is True
 
-    def test_home_subdirectories_allowed(self):
+    # User home directories should pass is_dangerous_path()
+    # (they are handled by is_home_directory_root() separately)
+    @pytest.mark.parametrize("path", _paths("/home/user", "/home/user/project", "/home/user/project/src/main.py"))
+    def test_home_subdirectories_allowed(self, path):
         """Test that /home subdirectories pass through is_dangerous_path().
 
         These paths should NOT be blocked by is_dangerous_path() because:
         1. /home/user/project is a valid user workspace
         2. Access control for /home/username is handled by is_home_directory_root()
         """
-        # User home directories should pass is_dangerous_path()
-        # (they are handled by is_home_directory_root() separately)
-        assert is_dangerous_path(Path("/home/user")) is False
-        assert is_dangerous_path(Path("/home/user/project")) is False
-        assert is_dangerous_path(Path("/home/user/project/src/main.py")) is False
+        assert is_dangerous_path(path) is False
 
     def test_home_deeply_nested_allowed(self):
         """Test that deeply nested home paths are allowed."""
@@ -91,13 +102,16 @@ class TestHomeDirectoryHandling:
 class TestRegressionPrevention:
     """Regression tests for the specific vulnerability."""
 
-    def test_etc_passwd_blocked(self):
-        """Test /etc/passwd is blocked (common attack target)."""
-        assert is_dangerous_path(Path("/etc/passwd")) is True
-
-    def test_etc_shadow_blocked(self):
-        """Test /etc/shadow is blocked (password hashes)."""
-        assert is_dangerous_path(Path("/etc/shadow")) is True
+    @pytest.mark.parametrize(
+        "path",
+        [
+            pytest.param(Path("/etc/passwd"), id="etc_passwd"),  # Common attack target
+            pytest.param(Path("/etc/shadow"), id="etc_shadow"),  # Password hashes
+        ],
+    )
+    def test_credential_files_blocked(self, path):
+        """Test that credential files under /etc are blocked."""
+        assert is_dangerous_path(path) is True
 
 
 class TestWindowsPathHandling:
@@ -105,7 +119,8 @@ class TestWindowsPathHandling:
 
     Fixes issue reported in PR #353: Windows paths like C:\\ have trailing
     backslash which caused double separator issues with string prefix matching.
-    Using Path.is_relative_to() resolves this correctly.
+    The root is now detected separately (a root is its own dirname) and only
+    non-root entries get a trailing separator, which resolves this correctly.
     """
 
     def test_windows_root_drive_blocked(self):
@@ -147,3 +162,171 @@ class TestWindowsPathHandling:
 
         # D: drive paths should not be relative to C:
         assert d_path.is_relative_to(c_root) is False
+
+    @pytest.fixture
+    def windows_tables(self, monkeypatch):
+        """Rebuild security_config's lookup tables as they would be built on Windows."""
+        import ntpath
+
+        monkeypatch.setattr(security_config, "os", SimpleNamespace(path=ntpath, sep="\\", name="nt"))
+        system_exact, home_exact, prefixes = security_config._build_dangerous_tables()
+        monkeypatch.setattr(security_config, "_DANGEROUS_SYSTEM_EXACT", system_exact)
+        monkeypatch.setattr(security_config, "_DANGEROUS_HOME_EXACT", home_exact)
+        monkeypatch.setattr(security_config, "_DANGEROUS_PREFIXES", prefixes)
+        # Bypass the memo cache so POSIX and Windows verdicts never mix
+        return security_config._is_dangerous_str.__wrapped__
+
+    def test_windows_tables_require_drive(self, windows_tables):
+        """Test that only drive-qualified entries make it into the Windows tables."""
+        assert "c:\\windows" in security_config._DANGEROUS_SYSTEM_EXACT
+        assert "c:\\program files\\" in security_config._DANGEROUS_PREFIXES
+        assert "c:\\users" in security_config._DANGEROUS_HOME_EXACT
+
+        # POSIX entries such as /etc would otherwise resolve to C:\\etc
+        assert not any(d.startswith("\\") for d in security_config._DANGEROUS_SYSTEM_EXACT)
+        assert "c:\\etc" not in security_config._DANGEROUS_SYSTEM_EXACT
+
+    def test_windows_dangerous_paths(self, windows_tables):
+        """Test Windows system paths, drive roots and home containers."""
+        is_dangerous_str = windows_tables
+
+        assert is_dangerous_str("C:\\") is True
+        assert is_dangerous_str("C:\\Windows") is True
+        assert is_dangerous_str("C:\\Windows\\System32\\drivers") is True
+        # normcase makes the comparison case-insensitive, as on NTFS
+        assert is_dangerous_str("c:\\WINDOWS\\system32") is True
+        assert is_dangerous_str("C:\\Program Files\\App") is True
+        assert is_dangerous_str("C:\\Users") is True
+
+    def test_windows_safe_paths(self, windows_tables):
+        """Test that similar names, other drives and user subdirectories are allowed."""
+        is_dangerous_str = windows_tables
+
+        assert is_dangerous_str("C:\\WindowsApps") is False
+        assert is_dangerous_str("D:\\Windows\\System32") is False
+        assert is_dangerous_str("C:\\Users\\alice\\project") is False
+        assert is_dangerous_str("C:\\etc\\config") is False
+
+
+class TestPathResolution:
+    """Test path resolution used by is_dangerous_path()."""
+
+    def test_relative_paths_follow_working_directory(self, monkeypatch):
+        """Test that relative paths are not served from a stale resolution cache."""
+        monkeypatch.chdir("/etc")
+        assert is_dangerous_path(Path("hosts")) is True
+
+        monkeypatch.chdir("/tmp")
+        assert is_dangerous_path(Path("hosts")) is False
+
+    @pytest.mark.parametrize(
+        "path", _paths("/", "/etc", "/etc/passwd", "/home", "/home/user/project", "/tmp/test", "/tmp/etcbackup")
+    )
+    def test_string_api_matches_path_api(self, path):
+        """Test that is_dangerous_path_str() agrees with is_dangerous_path()."""
+        assert is_dangerous_path_str(str(path)) is is_dangerous_path(path)
+
+    def test_unresolvable_path_blocked(self):
+        """Test that paths which cannot be resolved are treated as dangerous."""
+        assert is_dangerous_path_str("/tmp/bad\x00name") is True
+
+    def test_symlink_into_system_directory_blocked(self, tmp_path):
+        """Test that a symlink pointing into a system directory is blocked."""
+        link = tmp_path / "innocent"
+        link.symlink_to("/etc")
+        assert is_dangerous_path(link / "passwd") is True
+
+    def test_symlink_loop_blocked(self, tmp_path):
+        """Test that a self-referencing symlink fails closed, as Path.resolve() does."""
+        loop = tmp_path / "loop"
+        loop.symlink_to(loop)
+        assert is_dangerous_path(loop) is True
+        assert is_dangerous_path(loop / "child") is True
+
+    def test_resolved_paths_not_resolved_again(self, monkeypatch):
+        """Test that resolved=True checks the path as given instead of resolving it again."""
+
+        def fail_resolve(path):
+            raise AssertionError("resolve should not be called for resolved paths")
+
+        monkeypatch.setattr(security_config, "_resolve_path_str", fail_resolve)
+        assert is_dangerous_path(Path("/etc/passwd"), resolved=True) is True
+        assert is_dangerous_path(Path("/tmp/project/main.py"), resolved=True) is False
+
+    def test_repointed_symlink_rechecked(self, tmp_path):
+        """Test that a symlink re-pointed into a system directory is blocked on the next check."""
+        link = tmp_path / "moving"
+        link.symlink_to("/tmp")
+        assert is_dangerous_path(link / "passwd") is False
+
+        link.unlink()
+        link.symlink_to("/etc")
+        assert is_dangerous_path(link / "passwd") is True
+
+
+class TestSafeRoots:
+    """Test registered safe roots that skip checks for already-resolved paths."""
+
+    @pytest.fixture(autouse=True)
+    def isolated_safe_roots(self, monkeypatch):
+        monkeypatch.setattr(security_config, "_SAFE_ROOTS", set())
+        # Some tests patch the lookup tables; keep memoized verdicts from leaking across them
+        security_config._is_dangerous_str.cache_clear()
+        yield
+        security_config._is_dangerous_str.cache_clear()
+
+    @pytest.fixture
+    def project_root(self):
+        # Safe roots are stored resolved (e.g. /tmp -> /private/tmp on macOS)
+        with tempfile.TemporaryDirectory(dir="/tmp", prefix="pal_safe_root") as root:
+            yield Path(os.path.realpath(root))
+
+    def test_resolved_paths_under_safe_root_skip_resolution(self, monkeypatch, project_root):
+        """Test that resolved paths inside a safe root are accepted without resolving them again."""
+        register_safe_root(project_root)
+
+        def fail_resolve(path):
+            raise AssertionError("resolve should not be called for safe roots")
+
+        monkeypatch.setattr(security_config, "_resolve_path_str", fail_resolve)
+        assert is_dangerous_path(project_root, resolved=True) is False
+        assert is_dangerous_path(project_root / "src" / "main.py", resolved=True) is False
+
+    def test_unresolved_paths_under_safe_root_still_resolved(self, project_root):
+        """Test that a symlink plus .. inside a safe root cannot escape into a system directory."""
+        register_safe_root(project_root)
+        (project_root / "l").symlink_to("/etc/ssh")
+
+        # Lexically this is <root>/passwd, but it opens /etc/passwd
+        assert is_dangerous_path(project_root / "l" / ".." / "passwd") is True
+        assert is_dangerous_path(project_root / "l" / "sshd_config") is True
+
+    def test_traversal_out_of_safe_root_still_checked(self, project_root):
+        """Test that .. components cannot escape a safe root into a system directory."""
+        register_safe_root(project_root)
+        escape = project_root.joinpath(*[".."] * len(project_root.parts), "etc", "passwd")
+        assert is_dangerous_path(escape) is True
+
+    def test_similar_prefix_not_treated_as_safe(self, project_root):
+        """Test that a sibling sharing the root's name prefix is not inside the safe root."""
+        register_safe_root(project_root)
+        sibling = project_root.with_name(project_root.name + "_other")
+        assert security_config._is_under_safe_root(str(sibling)) is False
+
+    def test_dangerous_root_rejected(self):
+        """Test that system directories cannot be registered as safe roots."""
+        with pytest.raises(ValueError):
+            register_safe_root(Path("/etc"))
+        with pytest.raises(ValueError):
+            register_safe_root(Path("/"))
+
+    def test_root_containing_dangerous_path_rejected(self, monkeypatch):
+        """Test that a root above a system directory (e.g. /private on macOS) is rejected."""
+        monkeypatch.setattr(security_config, "_DANGEROUS_SYSTEM_EXACT", frozenset({"/srv/secrets"}))
+        with pytest.raises(ValueError):
+            register_safe_root(Path("/srv"))
+
+    def test_relative_root_rejected(self):
+        """Test that relative safe roots are rejected."""
+        with pytest.raises(ValueError):
+            register_safe_root(Path("project"))
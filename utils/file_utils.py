@@ -45,7 +45,7 @@ from pathlib import Path
 from typing import Optional
 
 from .file_types import BINARY_EXTENSIONS, CODE_EXTENSIONS, IMAGE_EXTENSIONS, TEXT_EXTENSIONS
-from .security_config import EXCLUDED_DIRS, is_dangerous_path
+from .security_config import is_dangerous_path, is_excluded_dir
 from .token_utils import DEFAULT_CONTEXT_WINDOW, estimate_tokens
 
 
@@ -311,7 +311,7 @@ def resolve_and_validate_path(path_str: str) -> Path:
     resolved_path = user_path.resolve()
 
     # Step 4: Check against dangerous paths
-    if is_dangerous_path(resolved_path):
+    if is_dangerous_path(resolved_path, resolved=True):
         logger.warning(f"Access denied - dangerous path: {resolved_path}")
         raise PermissionError(f"Access to system directory denied: {path_str}")
 
@@ -388,7 +388,7 @@ def expand_paths(paths: list[str], extensions: Optional[set[str]] = None) -> lis
                     if d.startswith("."):
                         continue
                     # Skip excluded directories
-                    if d in EXCLUDED_DIRS:
+                    if is_excluded_dir(d):
                         continue
                     # Skip MCP directories found during traversal
                     dir_path = Path(root) / d
@@ -5,28 +5,45 @@ This module contains security-related constants and configurations
 for file access control.
 """
 
+import errno
+import fnmatch
+import functools
+import os
+import re
+import sys
 from pathlib import Path
+from typing import Optional
+
+
+def _interned(paths: set[str]) -> frozenset[str]:
+    """Freeze a set of path constants, interning each string so lookups can short-circuit on identity."""
+    return frozenset(sys.intern(path) for path in paths)
+
 
 # Dangerous system paths - block these AND all their subdirectories
 # These are system directories where user code should never reside
-DANGEROUS_SYSTEM_PATHS = {
-    "/",
-    "/etc",
-    "/usr",
-    "/bin",
-    "/var",
-    "/root",
-    "C:\\Windows",
-    "C:\\Program Files",
-}
+DANGEROUS_SYSTEM_PATHS = _interned(
+    {
+        "/",
+        "/etc",
+        "/usr",
+        "/bin",
+        "/var",
+        "/root",
+        "C:\\Windows",
+        "C:\\Program Files",
+    }
+)
 
 # User home container paths - block ONLY the exact path, not subdirectories
 # Subdirectory access (e.g., /home/user/project) is controlled by is_home_directory_root()
 # This allows users to work in their home subdirectories while blocking overly broad access
-DANGEROUS_HOME_CONTAINERS = {
-    "/home",
-    "C:\\Users",
-}
+DANGEROUS_HOME_CONTAINERS = _interned(
+    {
+        "/home",
+        "C:\\Users",
+    }
+)
 
 # Combined set for backward compatibility
 DANGEROUS_PATHS = DANGEROUS_SYSTEM_PATHS | DANGEROUS_HOME_CONTAINERS
@@ -95,7 +112,195 @@ EXCLUDED_DIRS = {
 }
 
 
-def is_dangerous_path(path: Path) -> bool:
+def _compile_globs(patterns: set[str]) -> Optional[re.Pattern[str]]:
+    """Compile glob patterns into one regex, or None when there are none (an empty pattern matches everything)."""
+    if not patterns:
+        return None
+    return re.compile("|".join(fnmatch.translate(pattern) for pattern in sorted(patterns)))
+
+
+# EXCLUDED_DIRS split into literal names (one hash lookup) and glob patterns (one compiled regex)
+_EXCLUDED_LITERALS: frozenset[str] = frozenset(d for d in EXCLUDED_DIRS if not any(c in d for c in "*?["))
+_EXCLUDED_RE: Optional[re.Pattern[str]] = _compile_globs(EXCLUDED_DIRS - _EXCLUDED_LITERALS)
+
+
+def is_excluded_dir(name: str) -> bool:
+    """
+    Check if a directory name matches EXCLUDED_DIRS, including glob entries like "*.egg-info".
+
+    Args:
+        name: Directory name (a single path component, not a full path)
+
+    Returns:
+        True if the directory should be skipped during recursive file search
+    """
+    if name in _EXCLUDED_LITERALS:
+        return True
+    return _EXCLUDED_RE is not None and _EXCLUDED_RE.match(name) is not None
+
+
+def _platform_variants(paths: frozenset[str]) -> frozenset[str]:
+    """
+    Return the given paths together with their resolved forms, normcased and interned.
+
+    Resolving handles platform symlinks (e.g., macOS /etc -> /private/etc,
+    /var -> /private/var). Only paths that are absolute on the current platform
+    are kept: a resolved path is always absolute, so Windows entries can never
+    match on POSIX (and vice versa), and resolving them would turn Windows-style
+    strings into nonsense absolute paths.
+    """
+    variants = set()
+    for dangerous in paths:
+        # On Windows a path is only absolute with a drive ("/etc" would resolve to C:\etc)
+        if not os.path.isabs(dangerous) or (os.name == "nt" and not os.path.splitdrive(dangerous)[0]):
+            continue
+        variants.add(dangerous)
+        variants.add(os.path.realpath(dangerous))
+    return _interned({os.path.normcase(variant) for variant in variants})
+
+
+def _build_dangerous_tables() -> tuple[frozenset[str], frozenset[str], tuple[str, ...]]:
+    """
+    Build the normcased lookup tables used by _is_dangerous_str().
+
+    Returns:
+        (system paths, home containers, system prefixes with a trailing separator)
+    """
+    # Root "/" is excluded here - it is handled by the filesystem root check
+    system_variants = _platform_variants(DANGEROUS_SYSTEM_PATHS - {"/"})
+    # System entries nested under another system entry (e.g. /usr/bin when /bin -> /usr/bin)
+    # are already covered by the shorter prefix and dropped
+    system_exact = frozenset(
+        dangerous
+        for dangerous in system_variants
+        if not any(dangerous.startswith(other + os.sep) for other in system_variants)
+    )
+    home_exact = _platform_variants(DANGEROUS_HOME_CONTAINERS)
+    prefixes = tuple(sorted(sys.intern(dangerous + os.sep) for dangerous in system_exact))
+    return system_exact, home_exact, prefixes
+
+
+# Lookup tables built once at import, as normcased strings so the check runs entirely in
+# os.path/str space. Matching all subdirectories of a system path is a single
+# str.startswith() call over _DANGEROUS_PREFIXES. That call scans the tuple linearly, but in
+# C and over a handful of entries; a multi-pattern matcher such as Aho-Corasick would only
+# pay off with far more prefixes than this list holds, at the cost of a native dependency.
+_DANGEROUS_SYSTEM_EXACT, _DANGEROUS_HOME_EXACT, _DANGEROUS_PREFIXES = _build_dangerous_tables()
+
+
+# Registered project roots, stored resolved and normcased. Already-resolved paths that sit
+# under one of these skip the dangerous-path lookup (see register_safe_root())
+_SAFE_ROOTS: set[str] = set()
+
+
+def register_safe_root(path: Path) -> None:
+    """
+    Register a directory whose contents is_dangerous_path() accepts without further checks.
+
+    The root is resolved once here. The shortcut only applies to inputs the
+    caller marks as already resolved (resolved=True, as
+    resolve_and_validate_path() does): such paths contain no symlinks or ".."
+    components, so a plain string comparison against the root is exact.
+    Unresolved inputs are always resolved and checked in full.
+
+    Args:
+        path: Absolute directory to trust
+
+    Raises:
+        ValueError: If the path is relative, dangerous, or contains a dangerous path
+    """
+    if not path.is_absolute():
+        raise ValueError(f"Safe root must be an absolute path: {path}")
+
+    resolved_str = os.path.normcase(os.path.realpath(str(path)))
+    if is_dangerous_path_str(resolved_str):
+        raise ValueError(f"Cannot register a dangerous path as a safe root: {path}")
+
+    # A root above a dangerous directory (e.g. /private on macOS) would whitelist it
+    root_prefix = resolved_str.rstrip(os.sep) + os.sep
+    if any(dangerous.startswith(root_prefix) for dangerous in _DANGEROUS_SYSTEM_EXACT | _DANGEROUS_HOME_EXACT):
+        raise ValueError(f"Cannot register a safe root that contains a dangerous path: {path}")
+
+    _SAFE_ROOTS.add(resolved_str)
+
+
+def _is_under_safe_root(resolved_str: str) -> bool:
+    """Check whether an already-resolved path is inside a registered safe root."""
+    norm = os.path.normcase(resolved_str)
+    return any(norm == root or norm.startswith(root + os.sep) for root in _SAFE_ROOTS)
+
+
+def _realpath(path_str: str) -> str:
+    """
+    Resolve a path string with os.path.realpath(), failing on symlink loops.
+
+    Non-strict realpath() silently stops at a symlink loop, so the result is
+    stat()ed the way Path.resolve() does: a loop error is re-raised (and treated
+    as dangerous by the caller), any other error such as a missing file is ignored.
+    """
+    resolved_str = os.path.realpath(path_str)
+    try:
+        os.stat(resolved_str)
+    except OSError as e:
+        # Windows reports loops as ERROR_CANT_RESOLVE_FILENAME (1921) rather than ELOOP
+        if e.errno == errno.ELOOP or getattr(e, "winerror", 0) == 1921:
+            raise
+    return resolved_str
+
+
+def _resolve_path_str(path_str: str) -> str:
+    """
+    Resolve a path string to its canonical form (see _realpath()).
+
+    Working on strings avoids the Path construction that Path.resolve()
+    performs. Resolution is deliberately not cached: symlinks can be re-pointed
+    at any time, so a remembered result could let a now-dangerous path through.
+    """
+    return _realpath(path_str)
+
+
+@functools.lru_cache(maxsize=4096)
+def _is_dangerous_str(resolved_str: str) -> bool:
+    """
+    Check an already-resolved path string against the dangerous path tables.
+
+    Memoized because the same resolved paths (project roots, frequently read
+    files) are checked many times per session. The result depends only on the
+    string and the lookup tables built at import time: editing DANGEROUS_PATHS
+    after import has no effect, and code that patches the tables (e.g. tests)
+    must call _is_dangerous_str.cache_clear() afterwards.
+    """
+    resolved_str = os.path.normcase(resolved_str)
+
+    # Check 1: Root directory (filesystem root) - its own dirname, e.g. "/" or "c:\\"
+    if os.path.dirname(resolved_str) == resolved_str:
+        return True
+
+    # Check 2: Home containers - block ONLY exact match
+    # Subdirectories like /home/user/project should pass through here
+    # and be handled by is_home_directory_root() in resolve_and_validate_path()
+    if resolved_str in _DANGEROUS_HOME_EXACT:
+        return True
+
+    # Check 3: System paths - block exact match AND all subdirectories
+    return resolved_str in _DANGEROUS_SYSTEM_EXACT or resolved_str.startswith(_DANGEROUS_PREFIXES)
+
+
+def _is_dangerous_path_fast(path_str: str, resolved: bool) -> bool:
+    """Unguarded body of is_dangerous_path_str(); resolution errors propagate to the caller."""
+    if not resolved:
+        return _is_dangerous_str(_resolve_path_str(path_str))
+
+    # Resolved paths inside a registered project root cannot be dangerous. Unresolved input
+    # never takes this shortcut: a symlink plus ".." could lexically stay inside the root
+    # while actually pointing elsewhere.
+    if _SAFE_ROOTS and _is_under_safe_root(path_str):
+        return False
+
+    return _is_dangerous_str(path_str)
+
+
+def is_dangerous_path(path: Path, resolved: bool = False) -> bool:
     """
     Check if a path is in or under a dangerous directory.
 
@@ -110,6 +315,9 @@ def is_dangerous_path(path: Path) -> bool:
 
     Args:
         path: Path to check
+        resolved: True if the caller already resolved the path (symlinks
+            followed, ".." removed); the path is then checked as given,
+            without resolving it again, and registered safe roots apply
 
     Returns:
         True if the path is dangerous and should not be accessed
@@ -118,46 +326,26 @@ def is_dangerous_path(path: Path) -> bool:
         Fixes path traversal vulnerability (CWE-22) while preserving
         user access to home subdirectories.
     """
-    try:
-        resolved = path.resolve()
-
-        def _dangerous_variants(p: Path) -> set[Path]:
-            variants = {p}
-            # Only resolve paths that are absolute on the current platform.
-            # This avoids turning Windows-style strings into nonsense absolute paths on POSIX.
-            if p.is_absolute():
-                try:
-                    variants.add(p.resolve())
-                except Exception:
-                    pass
-            return variants
-
-        # Check 1: Root directory (filesystem root)
-        if resolved.parent == resolved:
-            return True
-
-        # Check 2: System paths - block exact match AND all subdirectories
-        for dangerous in DANGEROUS_SYSTEM_PATHS:
-            # Skip root "/" - already handled above
-            if dangerous == "/":
-                continue
-
-            for dangerous_path in _dangerous_variants(Path(dangerous)):
-                # is_relative_to() correctly handles both exact matches and subdirectories.
-                # Resolving the dangerous base path also handles platform symlinks
-                # (e.g., macOS /etc -> /private/etc, /var -> /private/var).
-                if resolved == dangerous_path or resolved.is_relative_to(dangerous_path):
-                    return True
-
-        # Check 3: Home containers - block ONLY exact match
-        # Subdirectories like /home/user/project should pass through here
-        # and be handled by is_home_directory_root() in resolve_and_validate_path()
-        for container in DANGEROUS_HOME_CONTAINERS:
-            for container_path in _dangerous_variants(Path(container)):
-                if resolved == container_path:
-                    return True
+    return is_dangerous_path_str(str(path), resolved=resolved)
 
-        return False
 
-    except Exception:
+def is_dangerous_path_str(path_str: str, resolved: bool = False) -> bool:
+    """
+    String variant of is_dangerous_path() with identical semantics.
+
+    Intended for hot loops that already hold path strings, so no Path object
+    is built per check. Unresolved input is resolved again on every call.
+
+    Args:
+        path_str: Path to check
+        resolved: True if the caller already resolved the path (see is_dangerous_path())
+
+    Returns:
+        True if the path is dangerous and should not be accessed
+    """
+    try:
+        return _is_dangerous_path_fast(path_str, resolved)
+    except (OSError, ValueError):
+        # OSError: resolution failed (symlink loop, deleted working directory)
+        # ValueError: malformed input such as an embedded null byte
         return True  # If we can't resolve, consider it dangerous